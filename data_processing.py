@@ -3,144 +3,256 @@ Data Processing Module for David Lynch Collection Dashboard
 Handles data loading, cleaning, and category detection
 """
 
-import json
+import os
+import re
+import orjson
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import streamlit as st
 
+DATA_FILE = "David Lynch Collection Data.json"
+CACHE_FILE = "David Lynch Collection Data.parquet"
 
-@st.cache_data
+# Text columns stored as Arrow-backed strings
+STRING_COLUMNS = ["Title", "URL", "Image", "Estimated Price"]
+
+# Category keywords - organized by most specific to general
+CATEGORY_KEYWORDS = {
+    "Scripts & Screenplays": ["script", "screenplay"],
+    "Cameras & Camcorders": ["camera", "camcorder"],
+    "Lighting Equipment": ["light", "lighting"],
+    "Books & Reference": ["book", "volume", "reference"],
+    "Posters & Prints": ["poster", "signed poster"],
+    "Furniture": ["sofa", "chair", "table", "furniture"],
+    "Coffee & Kitchen": ["mug", "cup", "coffee maker", "espresso"],
+    "Instruments & Audio": ["guitar", "bass", "keyboard", "drum", "microphone", "audio", "speaker"],
+    "Records & Music": ["record", "album", "vinyl"],
+    "Props & Memorabilia": ["prop", "memorabilia", "production slate"]
+}
+
+# One regex alternation per category, built once at import
+CATEGORY_PATTERNS = {
+    category: "|".join(map(re.escape, keywords))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+# Fixed set of category levels, stored as compact integer codes
+CATEGORY_DTYPE = pd.CategoricalDtype(list(CATEGORY_KEYWORDS) + ["Other"])
+
+
+@st.cache_data(show_spinner=False)
 def load_data():
     """
     Load and process the David Lynch Collection data from JSON file.
     Returns a pandas DataFrame with processed pricing and category information.
+    The processed frame is cached on disk as Parquet and reused while it is
+    newer than both the JSON source and this module.
     """
-    with open("David Lynch Collection Data.json", encoding="utf-8") as f:
-        data = json.load(f)
+    if _cache_is_fresh():
+        try:
+            df = pd.read_parquet(CACHE_FILE)
+            return df.astype({col: "string[pyarrow]" for col in STRING_COLUMNS})
+        except Exception:
+            pass  # A damaged cache falls through to re-parsing the JSON and rewriting it
 
-    # Initialize lists to store processed data
-    sold_prices, estimated_low, estimated_high, estimated_avg = [], [], [], []
-    estimated_price_raw, titles, urls, images = [], [], [], []
+    with open(DATA_FILE, "rb") as f:
+        data = orjson.loads(f.read())
 
-    # Process each item in the dataset
-    for item in data:
-        # Clean and convert sold price to integer
-        sold = int(item["Sold Price"].replace("$", "").replace(",", "").strip())
-        
-        # Process estimated price range
-        est_range = item["Estimated Price"].replace("$", "").replace(",", "").strip()
-        if "-" in est_range:
-            est_low, est_high = est_range.split("-")
-            est_low, est_high = int(est_low.strip()), int(est_high.strip())
-            est_avg = (est_low + est_high) / 2
-        else:
-            est_low = est_high = est_avg = int(est_range.strip())
-
-        # Append processed values to lists
-        sold_prices.append(sold)
-        estimated_low.append(est_low)
-        estimated_high.append(est_high)
-        estimated_avg.append(est_avg)
-        estimated_price_raw.append(item["Estimated Price"])
-        titles.append(item["Title"])
-        urls.append(item["Item URL"])
-        images.append(item["Item Image"])
+    # Flatten records into a DataFrame and keep only the fields we use
+    raw = pd.json_normalize(data)[
+        ["Title", "Sold Price", "Estimated Price", "Item URL", "Item Image"]
+    ]
+
+    # Clean and convert sold price to integer (vectorized over the column)
+    sold = raw["Sold Price"].str.replace(r"[\$,\s]", "", regex=True).astype(np.int32)
+
+    # Process estimated price range - single values use the same low and high
+    est_parts = (
+        raw["Estimated Price"]
+        .str.replace(r"[\$,\s]", "", regex=True)
+        .str.split("-", n=1, expand=True)
+    )
+    if est_parts.shape[1] == 1:
+        est_parts[1] = None
+    estimated_low = est_parts[0].astype(np.int32)
+    estimated_high = est_parts[1].fillna(est_parts[0]).astype(np.int32)
+    estimated_avg = ((estimated_low + estimated_high) / 2).astype(np.float32)
 
     # Create DataFrame with all processed data
     df = pd.DataFrame({
-        "Title": titles,
-        "Sold Price": sold_prices,
+        "Title": raw["Title"],
+        "Sold Price": sold,
         "Estimated Low": estimated_low,
         "Estimated High": estimated_high,
         "Estimate Avg": estimated_avg,
-        "Estimated Price": estimated_price_raw,
-        "URL": urls,
-        "Image": images
+        "Estimated Price": raw["Estimated Price"],
+        "URL": raw["Item URL"],
+        "Image": raw["Item Image"]
     })
     
+    # Store text columns as Arrow-backed strings for compact storage and
+    # compiled string kernels (e.g. the keyword filter)
+    for col in STRING_COLUMNS:
+        df[col] = df[col].astype("string[pyarrow]")
+    
     # Add category classification
-    df["Category"] = df["Title"].apply(detect_category)
+    df["Category"] = detect_categories(df["Title"]).astype(CATEGORY_DTYPE)
     
     # Add log transformation for visualization purposes
-    df["Log Sold Price"] = np.log10(df["Sold Price"] + 1)
+    df["Log Sold Price"] = np.log10(df["Sold Price"].to_numpy(dtype=np.float32) + 1.0)
+    
+    # Persist the processed frame so the next cold start can skip parsing.
+    # Write to a temporary file and swap it in, so readers never see a partial cache
+    tmp_file = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_file, compression="snappy")
+        os.replace(tmp_file, CACHE_FILE)
+    except Exception:
+        # Read-only deployments simply keep re-parsing the JSON
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
     
     return df
 
 
-def detect_category(title):
+def _cache_is_fresh():
+    """Check whether the Parquet cache is newer than its inputs."""
+    try:
+        cache_mtime = os.path.getmtime(CACHE_FILE)
+    except OSError:
+        return False
+    source_mtime = max(os.path.getmtime(DATA_FILE), os.path.getmtime(__file__))
+    return cache_mtime >= source_mtime
+
+
+def detect_categories(titles):
     """
     Automatically categorize items based on keywords in their titles.
-    This function uses pattern matching to classify David Lynch collection items.
+    Each category is matched with one regex pass over the column, and the
+    first matching category (in CATEGORY_KEYWORDS order) wins.
     
     Args:
-        title (str): The title of the auction item
+        titles (pd.Series): Item titles
         
     Returns:
-        str: The detected category name
+        pd.Series: The detected category name for each title
     """
-    title = title.lower()
-    
-    # Define category keywords - organized by most specific to general
-    category_keywords = {
-        "Scripts & Screenplays": ["script", "screenplay"],
-        "Cameras & Camcorders": ["camera", "camcorder"],
-        "Lighting Equipment": ["light", "lighting"],
-        "Books & Reference": ["book", "volume", "reference"],
-        "Posters & Prints": ["poster", "signed poster"],
-        "Furniture": ["sofa", "chair", "table", "furniture"],
-        "Coffee & Kitchen": ["mug", "cup", "coffee maker", "espresso"],
-        "Instruments & Audio": ["guitar", "bass", "keyboard", "drum", "microphone", "audio", "speaker"],
-        "Records & Music": ["record", "album", "vinyl"],
-        "Props & Memorabilia": ["prop", "memorabilia", "production slate"]
-    }
-    
-    # Check each category for matching keywords
-    for category, keywords in category_keywords.items():
-        if any(keyword in title for keyword in keywords):
-            return category
+    conditions = [
+        titles.str.contains(pattern, case=False, regex=True, na=False).to_numpy(dtype=bool)
+        for pattern in CATEGORY_PATTERNS.values()
+    ]
+    categories = np.select(conditions, list(CATEGORY_PATTERNS), default="Other")
+    return pd.Series(categories, index=titles.index, dtype=object)
+
+
+@st.cache_data(show_spinner=False)
+def get_categories(df):
+    """Return the sorted list of categories present in the dataset."""
+    return sorted(df["Category"].unique().tolist())
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_category_counts(df):
+    """
+    Count items per category with one bincount over the Categorical codes.
     
-    # Default category if no matches found
-    return "Other"
+    Args:
+        df (pd.DataFrame): Dataset with a Categorical Category column
+        
+    Returns:
+        pd.Series: Item counts for the categories present, largest first
+    """
+    categories = df["Category"].cat.categories
+    counts = pd.Series(
+        np.bincount(df["Category"].cat.codes.to_numpy(), minlength=len(categories)),
+        index=categories,
+        name="count"
+    )
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
 
 
-@st.cache_data
+@st.cache_data(show_spinner=False, max_entries=32)
 def get_filtered_data(df, selected_categories, keyword="", price_filter=None):
     """
     Filter the DataFrame based on selected categories, keyword search, and price range.
-    Now with caching for better performance.
+    Now with caching for better performance - pass selected_categories as a
+    sorted tuple so identical filter states share one cache entry.
     """
-    # Convert lists to tuples for hashing
-    selected_categories = tuple(sorted(selected_categories))
+    # Filter by categories - OR together the precomputed per-category masks
+    category_masks = _category_masks(df)
+    mask = np.zeros(len(df), dtype=bool)
+    for category in selected_categories:
+        if category in category_masks:
+            mask |= category_masks[category]
     
-    # Filter by categories
-    filtered_df = df[df["Category"].isin(selected_categories)]
-    
-    # Apply keyword filter if provided
+    # Apply keyword filter if provided - runs in Arrow's substring kernel
     if keyword:
-        filtered_df = filtered_df[
-            filtered_df["Title"].str.contains(keyword, case=False, na=False)
-        ]
+        titles = pa.array(df["Title"].array)
+        keyword_mask = pc.fill_null(pc.match_substring(titles, keyword, ignore_case=True), False)
+        mask &= keyword_mask.to_numpy(zero_copy_only=False)
     
     # Apply price filter if provided
     if price_filter:
         min_price, max_price = price_filter
-        filtered_df = filtered_df[
-            (filtered_df["Sold Price"] >= min_price) & 
-            (filtered_df["Sold Price"] <= max_price)
-        ]
+        sold = df["Sold Price"].to_numpy()
+        mask &= (sold >= min_price) & (sold <= max_price)
+    
+    filtered_df = df[mask]
     
     return filtered_df
 
 
-@st.cache_data
+@st.cache_data(show_spinner=False)
+def _category_masks(df):
+    """Build one boolean row mask per category, computed once per dataset."""
+    codes = df["Category"].cat.codes.to_numpy()
+    return {
+        category: codes == code
+        for code, category in enumerate(df["Category"].cat.categories)
+    }
+
+
+@st.cache_data(show_spinner=False)
+def get_top_items(df, n_items=10, ascending=False):
+    """
+    Select the most (or least) expensive items, sorted by sold price.
+    Uses a partial partition so only the selected rows are fully sorted.
+    
+    Args:
+        df (pd.DataFrame): Dataset with a Sold Price column
+        n_items (int): Number of items to return
+        ascending (bool): Return the cheapest items instead of the most expensive
+        
+    Returns:
+        pd.DataFrame: The selected rows, ordered by Sold Price
+    """
+    sold = df["Sold Price"].to_numpy()
+    sort_key = sold if ascending else -sold
+    
+    n_items = min(max(n_items, 0), len(sort_key))
+    if n_items:
+        # Partition to find the cut-off price, then break ties by row order like nlargest/nsmallest
+        cutoff = np.partition(sort_key, n_items - 1)[n_items - 1]
+        below = np.flatnonzero(sort_key < cutoff)
+        ties = np.flatnonzero(sort_key == cutoff)[:n_items - len(below)]
+        positions = np.sort(np.concatenate([below, ties]))
+    else:
+        positions = np.arange(0)
+    positions = positions[np.argsort(sort_key[positions], kind="stable")]
+    
+    return df.iloc[positions]
+
+
+@st.cache_data(show_spinner=False)
 def calculate_summary_stats(df):
     """
     Calculate summary statistics for the filtered dataset.
     Now cached for better performance.
     """
-    # Convert DataFrame to a hashable representation
-    df_hash = hash(str(df.values.tobytes()))
-    
     if df.empty:
         return {
             "total_items": 0,
@@ -153,15 +265,58 @@ def calculate_summary_stats(df):
             "most_common_category": "N/A"
         }
     
+    # Work on the raw price array so every statistic comes from one column sweep
+    sold = df["Sold Price"].to_numpy()
+    cheapest_pos, most_expensive_pos = int(sold.argmin()), int(sold.argmax())
+    category_counts = np.bincount(
+        df["Category"].cat.codes.to_numpy(), minlength=len(df["Category"].cat.categories)
+    )
+    
     stats = {
         "total_items": df.shape[0],
-        "total_value": df["Sold Price"].sum(),
-        "average_price": df["Sold Price"].mean(),
-        "min_price": df["Sold Price"].min(),
-        "max_price": df["Sold Price"].max(),
-        "most_expensive": df.loc[df["Sold Price"].idxmax()],
-        "cheapest": df.loc[df["Sold Price"].idxmin()],
-        "most_common_category": df["Category"].value_counts().idxmax()
+        "total_value": sold.sum(dtype=np.int64),
+        "average_price": sold.mean(),
+        "min_price": sold[cheapest_pos],
+        "max_price": sold[most_expensive_pos],
+        "most_expensive": df.iloc[most_expensive_pos],
+        "cheapest": df.iloc[cheapest_pos],
+        "most_common_category": df["Category"].cat.categories[category_counts.argmax()]
     }
     
     return stats
+
+
+@st.cache_data(show_spinner=False)
+def compute_insights(df):
+    """
+    Calculate the Insights tab metrics in a single pass over the price columns.
+    
+    Args:
+        df (pd.DataFrame): Filtered dataset (must not be empty)
+        
+    Returns:
+        dict: Share of items above estimate, their average premium and the top category
+    """
+    sold = df["Sold Price"].to_numpy()
+    estimate = df["Estimate Avg"].to_numpy()
+    over_mask = sold > estimate
+    over_count = int(over_mask.sum())
+    
+    if over_count:
+        over_estimate = estimate[over_mask]
+        avg_premium = float(((sold[over_mask] - over_estimate) / over_estimate).mean() * 100)
+    else:
+        avg_premium = 0.0
+    
+    category_counts = np.bincount(
+        df["Category"].cat.codes.to_numpy(), minlength=len(df["Category"].cat.categories)
+    )
+    top_code = category_counts.argmax()
+    
+    return {
+        "over_count": over_count,
+        "over_percentage": over_count / len(sold) * 100,
+        "avg_premium": avg_premium,
+        "top_category": df["Category"].cat.categories[top_code],
+        "top_category_count": int(category_counts[top_code])
+    }
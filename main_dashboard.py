@@ -3,14 +3,14 @@ David Lynch Collection Dashboard - Main Application
 Interactive Streamlit dashboard for exploring the David Lynch Collection auction data
 """
 
+import textwrap
 import streamlit as st
 from theme_utils import theme_manager
 
-# Import our custom modules
-from data_processing import load_data, get_filtered_data, calculate_summary_stats
-from visualizations import (
-    create_treemap, create_scatter_plot, create_horizontal_bar_chart,
-    create_dumbbell_chart, show_item_gallery
+# Import our custom modules (Plotly-backed chart builders are imported inside their tabs)
+from data_processing import (
+    load_data, get_categories, get_filtered_data, get_top_items, calculate_summary_stats,
+    compute_insights
 )
 from ui_components import (
     create_sidebar_filters, create_data_table, create_summary_display,
@@ -24,25 +24,31 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
-# Apply global theme styling
-try:
-    current_theme = theme_manager.get_current_theme()
-    theme_css = theme_manager.get_theme_css(current_theme)
-    st.markdown(theme_css, unsafe_allow_html=True)
-except Exception:
-    pass  # Fallback gracefully if theme manager fails
+# Unfiltered collections larger than this open the data table on a preview
+TABLE_PREVIEW_THRESHOLD = 500
+TABLE_PREVIEW_ROWS = 100
 
-# Enhanced styling for better tab experience
-st.markdown("""
+# Draw the section navigation radio (the only st.radio in the app) as a tab bar
+TAB_CSS = """
 <style>
-    .stTabs [data-baseweb="tab-list"] {
+    .stRadio [role="radiogroup"] {
         gap: 8px;
+        border-bottom: 1px solid rgba(128, 128, 128, 0.3);
     }
-    .stTabs [data-baseweb="tab"] {
+    .stRadio [role="radiogroup"] > label {
         height: 50px;
+        margin: 0;
         padding-left: 20px;
         padding-right: 20px;
         border-radius: 8px 8px 0px 0px;
+        border-bottom: 3px solid transparent;
+    }
+    .stRadio [role="radiogroup"] > label > div:first-child {
+        display: none;
+    }
+    .stRadio [role="radiogroup"] > label:has(input:checked) {
+        border-bottom-color: #f63366;
+        font-weight: 600;
     }
     .metric-container {
         background-color: #f0f2f6;
@@ -51,7 +57,15 @@ st.markdown("""
         margin: 0.5rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Apply global theme styling and tab styling as a single element
+try:
+    current_theme = theme_manager.get_current_theme()
+    theme_css = textwrap.dedent(theme_manager.get_theme_css(current_theme))
+except Exception:
+    theme_css = ""  # Fallback gracefully if theme manager fails
+st.markdown(theme_css + TAB_CSS, unsafe_allow_html=True)
 
 # ----------------- Main Title and Introduction -----------------
 st.title("🎬 David Lynch Collection Dashboard")
@@ -59,18 +73,20 @@ st.markdown("""
 *Explore the fascinating world of David Lynch through the auction data of his personal collection.*
 """)
 
-# Add loading for data loading (after st.set_page_config())
-with st.spinner("🔄 Loading David Lynch Collection data..."):
-    df = load_data()
+# Load the collection data (cached, so reruns don't show a spinner)
+df = load_data()
 
 # Add loading for filter application (after getting filters)
 selected_categories, keyword = create_sidebar_filters(df)
 
+# Skip the filter pass entirely on the landing state (all categories, no keyword, full price range)
+price_filter = st.session_state.get('price_filter')
+filters_active = bool(keyword or price_filter or len(selected_categories) < len(get_categories(df)))
+
 # Show loading when applying filters
-if selected_categories or keyword or hasattr(st.session_state, 'price_filter'):
+if filters_active:
     with st.spinner("🔍 Applying filters..."):
-        price_filter = getattr(st.session_state, 'price_filter', None)
-        filtered_df = get_filtered_data(df, selected_categories, keyword, price_filter)
+        filtered_df = get_filtered_data(df, tuple(sorted(selected_categories)), keyword, price_filter)
         stats = calculate_summary_stats(filtered_df)
 else:
     filtered_df = df
@@ -79,14 +95,14 @@ else:
 # Display filter information with loading feedback
 if filtered_df.empty:
     st.warning("⚠️ No items match your current filters. Try adjusting your selection.")
-else:
+elif filters_active:
     display_filter_info(selected_categories, keyword, len(df), len(filtered_df))
 
 # ----------------- Create Tab Navigation -----------------
-tab1, tab2, tab3, tab4, tab5 = create_tab_navigation()
+active_tab = create_tab_navigation()
 
 # ----------------- Data Table Tab -----------------
-with tab1:
+if active_tab == "browse":
     st.header("📋 Browse Collection")
     
     with st.expander("💡 How to use this table", expanded=False):
@@ -103,7 +119,13 @@ with tab1:
             
         st.subheader("Detailed Data Table")
         with st.spinner("🔄 Preparing interactive table..."):
-            create_data_table(filtered_df)
+            # Without filters, a large collection opens on a preview instead of the full grid
+            if not filters_active and len(filtered_df) > TABLE_PREVIEW_THRESHOLD:
+                st.info(f"Showing the first {TABLE_PREVIEW_ROWS} of {len(filtered_df):,} items - "
+                        "apply a filter to refine the table.")
+                create_data_table(filtered_df.head(TABLE_PREVIEW_ROWS))
+            else:
+                create_data_table(filtered_df)
             
         st.subheader("Export Data")
         create_download_buttons(filtered_df)
@@ -111,7 +133,9 @@ with tab1:
         st.warning("No items match your current filter criteria. Please adjust your filters.")
 
 # ----------------- Treemap Tab -----------------
-with tab2:
+elif active_tab == "map":
+    from visualizations import create_treemap
+    
     st.header("🗺️ Collection Map")
     
     if not filtered_df.empty:
@@ -139,7 +163,9 @@ with tab2:
         st.warning("No data available for the treemap with current filters.")
 
 # ----------------- Scatter Plot Tab -----------------
-with tab3:
+elif active_tab == "prices":
+    from visualizations import create_scatter_plot
+    
     st.header("💰 Price Explorer")
     
     if not filtered_df.empty:
@@ -163,7 +189,9 @@ with tab3:
         st.warning("No data available for the scatter plot with current filters.")
 
 # ----------------- Insights Tab -----------------
-with tab4:
+elif active_tab == "insights":
+    from visualizations import create_horizontal_bar_chart, create_dumbbell_chart, show_item_gallery
+    
     st.header("🔍 Collection Insights")
     
     if not filtered_df.empty:
@@ -171,13 +199,12 @@ with tab4:
         col1, col2, col3 = st.columns(3)
         
         with st.spinner("📊 Calculating insights..."):
-            over_estimate = filtered_df[filtered_df["Sold Price"] > filtered_df["Estimate Avg"]]
-            under_estimate = filtered_df[filtered_df["Sold Price"] < filtered_df["Estimate Avg"]]
-            over_percentage = (len(over_estimate) / len(filtered_df)) * 100
-            avg_premium = ((over_estimate["Sold Price"] - over_estimate["Estimate Avg"]) / over_estimate["Estimate Avg"] * 100).mean() if len(over_estimate) > 0 else 0
+            insights = compute_insights(filtered_df)
+            over_percentage = insights["over_percentage"]
+            avg_premium = insights["avg_premium"]
         
         with col1:
-            st.metric("Above Estimate", f"{over_percentage:.0f}%", f"{len(over_estimate)} items")
+            st.metric("Above Estimate", f"{over_percentage:.0f}%", f"{insights['over_count']} items")
         
         with col2:
             if avg_premium > 0:
@@ -186,11 +213,14 @@ with tab4:
                 st.metric("Average Premium", "0%")
         
         with col3:
-            highest_category = filtered_df["Category"].value_counts().idxmax()
-            st.metric("Top Category", highest_category, f"{filtered_df['Category'].value_counts().iloc[0]} items")
+            st.metric("Top Category", insights["top_category"], f"{insights['top_category_count']} items")
         
         st.markdown("---")
         
+        # Select the top and bottom items once and share them across the charts below
+        top_expensive = get_top_items(filtered_df, n_items=10)
+        top_cheapest = get_top_items(filtered_df, n_items=10, ascending=True)
+        
         insight_tab1, insight_tab2, insight_tab3 = st.tabs(["📊 Market Performance", "🖼️ Top Items", "📈 Price Patterns"])
         
         with insight_tab1:
@@ -198,7 +228,7 @@ with tab4:
             st.markdown("How auction estimates compared to final sale prices for the most valuable items.")
             
             with st.spinner("📊 Creating performance analysis..."):
-                fig_dumbbell = create_dumbbell_chart(filtered_df, n_items=10)
+                fig_dumbbell = create_dumbbell_chart(top_expensive, n_items=10)
                 st.plotly_chart(fig_dumbbell, use_container_width=True, key="dumbbell_insights")
             
             st.markdown("#### Market Insights")
@@ -213,7 +243,7 @@ with tab4:
             st.markdown("The most valuable and distinctive pieces from the filtered selection.")
             
             with st.spinner("🖼️ Loading collection highlights..."):
-                show_item_gallery(filtered_df, n_items=8, columns=4)
+                show_item_gallery(top_expensive, n_items=8, columns=4)
         
         with insight_tab3:
             st.markdown("#### Price Distribution Analysis")
@@ -224,7 +254,7 @@ with tab4:
                 st.markdown("**Highest Values**")
                 with st.spinner("📈 Analyzing top items..."):
                     fig_expensive = create_horizontal_bar_chart(
-                        filtered_df, 
+                        top_expensive, 
                         "Top 10 Most Expensive", 
                         n_items=10, 
                         ascending=False
@@ -235,7 +265,7 @@ with tab4:
                 st.markdown("**Best Value Finds**")
                 with st.spinner("💰 Finding best values..."):
                     fig_cheapest = create_horizontal_bar_chart(
-                        filtered_df, 
+                        top_cheapest, 
                         "Top 10 Cheapest", 
                         n_items=10, 
                         ascending=True
@@ -244,7 +274,7 @@ with tab4:
     else:
         st.warning("No data available for insights with current filters.")
 # ----------------- About Tab -----------------
-with tab5:
+elif active_tab == "about":
     show_about()
 
 # ----------------- Footer -----------------
@@ -5,70 +5,33 @@ Handles dynamic theme detection and AgGrid styling
 
 import streamlit as st
 
-class ThemeManager:
-    """Manages theme detection and AgGrid styling"""
-    
-    def __init__(self):
-        self.themes = {
-            'light': {
-                'aggrid_theme': 'alpine',
-                'colors': {
-                    'background': '#ffffff',
-                    'surface': '#f8f9fa',
-                    'header': '#e9ecef',
-                    'text': '#212529',
-                    'border': '#dee2e6',
-                    'hover': '#f8f9fa',
-                    'selected': '#e7f3ff'
-                }
-            },
-            'dark': {
-                'aggrid_theme': 'balham',
-                'colors': {
-                    'background': '#0e1117',
-                    'surface': '#262730',
-                    'header': '#3d4043',
-                    'text': '#fafafa',
-                    'border': '#4a4a4a',
-                    'hover': '#262730',
-                    'selected': '#1e3a5f'
-                }
-            }
-        }
-    
-    def get_current_theme(self):
-        """Detect current Streamlit theme with auto-initialization"""
-        
-        # Auto-initialize theme preference if not set
-        if not hasattr(st.session_state, 'theme_preference'):
-            # Default to dark since that's what was working
-            st.session_state.theme_preference = 'dark'
-        
-        return st.session_state.theme_preference
-    
-    def get_theme_css(self, theme_name):
-        """Generate CSS for AgGrid theming with maximum override force"""
-        theme = self.themes.get(theme_name, self.themes['light'])
-        colors = theme['colors']
-        
-        return f"""
+# CSS template for AgGrid theming, filled in with a theme's colour palette
+_CSS_TEMPLATE = """
         <style>
         /* Nuclear option - override everything AgGrid related */
         div[data-testid="stAgGrid"] {{
-            background-color: {colors['background']} !important;
+            background-color: {background} !important;
         }}
         
         div[data-testid="stAgGrid"] > div {{
-            background-color: {colors['background']} !important;
+            background-color: {background} !important;
         }}
         
-        /* Target all possible AgGrid containers */
+        /* Theme the AgGrid containers through its CSS variables - no universal selector */
         .ag-theme-alpine,
         .ag-theme-balham,
-        .ag-theme-alpine *,
-        .ag-theme-balham * {{
-            background-color: {colors['background']} !important;
-            color: {colors['text']} !important;
+        .ag-theme-streamlit {{
+            --ag-background-color: {background};
+            --ag-foreground-color: {text};
+            --ag-data-color: {text};
+            --ag-header-background-color: {header};
+            --ag-header-foreground-color: {text};
+            --ag-odd-row-background-color: {surface};
+            --ag-border-color: {border};
+            --ag-row-hover-color: {hover};
+            --ag-selected-row-background-color: {selected};
+            background-color: {background} !important;
+            color: {text} !important;
         }}
         
         /* Specific overrides for main containers */
@@ -78,8 +41,8 @@ class ThemeManager:
         .ag-center-cols-container,
         .ag-body-horizontal-scroll-viewport,
         .ag-body-vertical-scroll-viewport {{
-            background-color: {colors['background']} !important;
-            color: {colors['text']} !important;
+            background-color: {background} !important;
+            color: {text} !important;
         }}
         
         /* Row overrides */
@@ -87,35 +50,35 @@ class ThemeManager:
         .ag-row-even,
         .ag-row-odd,
         .ag-cell {{
-            background-color: {colors['background']} !important;
-            color: {colors['text']} !important;
-            border-color: {colors['border']} !important;
+            background-color: {background} !important;
+            color: {text} !important;
+            border-color: {border} !important;
         }}
         
         /* Alternate row coloring for better visibility */
         .ag-row-odd .ag-cell {{
-            background-color: {colors['surface']} !important;
+            background-color: {surface} !important;
         }}
         
         /* Header styling */
         .ag-header,
         .ag-header-row,
         .ag-header-cell {{
-            background-color: {colors['header']} !important;
-            color: {colors['text']} !important;
-            border-color: {colors['border']} !important;
+            background-color: {header} !important;
+            color: {text} !important;
+            border-color: {border} !important;
         }}
         
         .ag-header-cell-label {{
-            color: {colors['text']} !important;
+            color: {text} !important;
             font-weight: 600 !important;
         }}
         
         /* Pagination */
         .ag-paging-panel {{
-            background-color: {colors['surface']} !important;
-            color: {colors['text']} !important;
-            border-color: {colors['border']} !important;
+            background-color: {surface} !important;
+            color: {text} !important;
+            border-color: {border} !important;
         }}
         
         /* Links remain red */
@@ -124,6 +87,58 @@ class ThemeManager:
         }}
         </style>
         """
+
+
+class ThemeManager:
+    """Manages theme detection and AgGrid styling"""
+    
+    def __init__(self):
+        self.themes = {
+            'light': {
+                'aggrid_theme': 'alpine',
+                'colors': {
+                    'background': '#ffffff',
+                    'surface': '#f8f9fa',
+                    'header': '#e9ecef',
+                    'text': '#212529',
+                    'border': '#dee2e6',
+                    'hover': '#f8f9fa',
+                    'selected': '#e7f3ff'
+                }
+            },
+            'dark': {
+                'aggrid_theme': 'balham',
+                'colors': {
+                    'background': '#0e1117',
+                    'surface': '#262730',
+                    'header': '#3d4043',
+                    'text': '#fafafa',
+                    'border': '#4a4a4a',
+                    'hover': '#262730',
+                    'selected': '#1e3a5f'
+                }
+            }
+        }
+        
+        # Render the CSS for every theme once instead of on each rerun
+        self._css_cache = {
+            name: _CSS_TEMPLATE.format(**theme['colors'])
+            for name, theme in self.themes.items()
+        }
+    
+    def get_current_theme(self):
+        """Detect current Streamlit theme with auto-initialization"""
+        
+        # Auto-initialize theme preference if not set
+        if not hasattr(st.session_state, 'theme_preference'):
+            # Default to dark since that's what was working
+            st.session_state.theme_preference = 'dark'
+        
+        return st.session_state.theme_preference
+    
+    def get_theme_css(self, theme_name):
+        """Get the precomputed CSS for AgGrid theming with maximum override force"""
+        return self._css_cache.get(theme_name, self._css_cache['light'])
     
     def get_aggrid_theme(self):
         """Get the appropriate AgGrid theme as string"""
@@ -3,25 +3,92 @@ UI Components Module for David Lynch Collection Dashboard
 Contains reusable UI components and data table configurations
 """
 
+import io
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
-import tempfile
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, JsCode
 import contextlib
-import time
+from data_processing import get_categories, get_category_counts
+
+# URL parts shared by every row - stripped before the rows are sent to AgGrid
+# and rebuilt in the browser by the cell renderers
+IMAGE_URL_PREFIX = "https://assets.basta.app/accounts/42e1dad9-7eb0-499b-9c8a-c08fbdfed260/images/"
+IMAGE_URL_SUFFIX = "?format=auto&width=3840&quality=75"
+ITEM_URL_PREFIX = "https://www.juliensauctions.com/en/items/"
+
+# Source columns shown in the data table (URL is displayed as "Link")
+_TABLE_COLS = ["Image", "Title", "Sold Price", "Estimated Price", "Estimate Avg", "Category", "URL"]
+
+# AgGrid cell formatting and renderers, built once at import
+_DOLLAR_FMT = JsCode("""
+    function(params) {
+        if (params.value != null) {
+            return '$' + params.value.toLocaleString();
+        } else {
+            return '';
+        }
+    }
+""")
+
+# Clickable link, rebuilt from the item-specific part of the URL
+_URL_RENDERER = JsCode("""
+    class UrlRenderer {
+        init(params) {
+            const url = params.value.startsWith('http')
+                ? params.value
+                : params.context.itemUrlPrefix + params.value;
+            this.eGui = document.createElement('a');
+            this.eGui.setAttribute('href', url);
+            this.eGui.setAttribute('target', '_blank');
+            this.eGui.setAttribute('title', 'Open item details in new tab');
+            this.eGui.style.display = 'inline-flex';
+            this.eGui.style.alignItems = 'center';
+            this.eGui.innerHTML = '🔗 Open details page';
+        }
+        getGui() {
+            return this.eGui;
+        }
+    }
+""")
+
+# Clickable thumbnail, rebuilt from the image-specific part of the URL
+_IMAGE_RENDERER = JsCode("""
+    class ImageRenderer {
+        init(params) {
+            const src = params.value.startsWith('http')
+                ? params.value
+                : params.context.imageUrlPrefix + params.value + params.context.imageUrlSuffix;
+            this.eGui = document.createElement('div');
+            this.eGui.innerHTML = `
+                <div style="
+                    position: relative;
+                    display: inline-block;
+                    cursor: pointer;
+                ">
+                    <img src="${src}" style="
+                        width: 100px;
+                        transition: transform 0.2s ease;
+                        display: block;
+                        margin: 0 auto;
+                    "
+                    onclick="window.open('${src}', '_blank')"
+                    title="Click to view full image">
+                </div>
+            `;
+        }
+        getGui() {
+            return this.eGui;
+        }
+    }
+""")
+
 
 @contextlib.contextmanager
 def loading_spinner(text="Loading..."):
     """Context manager for showing loading spinners"""
-    placeholder = st.empty()
-    with placeholder.container():
-        st.spinner(text)
+    with st.spinner(text):
         yield
-    placeholder.empty()
-
-def show_loading_message(message, duration=0.5):
-    """Show a brief loading message"""
-    with st.spinner(message):
-        time.sleep(duration)
 
 
 def create_sidebar_filters(df):
@@ -40,142 +107,89 @@ def create_sidebar_filters(df):
     # Search with clear button
     st.sidebar.markdown("### Search Collection")
     
-    # Initialize search in session state
-    if "search_keyword" not in st.session_state:
-        st.session_state.search_keyword = ""
-    
     col1, col2 = st.sidebar.columns([4, 1])
     
     with col1:
         keyword = st.text_input(
             "Search by keyword in title", 
-            value=st.session_state.search_keyword,
             placeholder="e.g., coffee, camera, script...",
             label_visibility="collapsed",
-            key=f"search_input_{st.session_state.get('search_clear_counter', 0)}"
+            key="search_keyword"
         )
     
     with col2:
-        if st.button("Clear", use_container_width=True, type="secondary"):
-            st.session_state.search_keyword = ""
-            # Force the text input to update by using a unique key
-            if 'search_clear_counter' not in st.session_state:
-                st.session_state.search_clear_counter = 0
-            st.session_state.search_clear_counter += 1
-            st.rerun()
-    
-    # Update session state when input changes
-    if keyword != st.session_state.search_keyword:
-        st.session_state.search_keyword = keyword
-    
-    keyword = st.session_state.search_keyword
+        # Callbacks run before the rerun the click triggers, so no explicit st.rerun() is needed
+        st.button("Clear", use_container_width=True, type="secondary",
+                  on_click=_set_session_value, args=("search_keyword", ""))
     
     st.sidebar.markdown("---")
     
     # Category filtering
     st.sidebar.markdown("### Filter by Category")
     
-    categories = sorted(df["Category"].unique())
-    category_counts = df["Category"].value_counts()
+    categories, category_counts, min_price, max_price = _sidebar_catalog(df)
+    
+    # Improved category grouping - include Props & Memorabilia in main groups
+    creative_categories = ["Scripts & Screenplays", "Books & Reference", "Posters & Prints", "Props & Memorabilia"]
+    equipment_categories = ["Cameras & Camcorders", "Lighting Equipment", "Instruments & Audio"]
+    personal_categories = ["Coffee & Kitchen", "Records & Music", "Furniture"]
+    grouped_categories = creative_categories + equipment_categories + personal_categories
+    
+    # List categories group by group, with anything ungrouped at the end
+    category_options = [cat for cat in grouped_categories if cat in categories]
+    category_options += [cat for cat in categories if cat not in grouped_categories]
     
     # Initialize session state for category selection
     if "selected_categories" not in st.session_state:
-        st.session_state.selected_categories = {category: True for category in categories}
+        st.session_state.selected_categories = list(category_options)
     
     # Selection buttons
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        if st.button("Select All", use_container_width=True):
-            for category in categories:
-                st.session_state.selected_categories[category] = True
-            st.rerun()
+        st.button("Select All", use_container_width=True,
+                  on_click=_set_session_value, args=("selected_categories", list(category_options)))
     
     with col2:
-        if st.button("Clear All", use_container_width=True):
-            for category in categories:
-                st.session_state.selected_categories[category] = False
-            st.rerun()
-    
-    # Improved category grouping - include Props & Memorabilia in main groups
-    creative_categories = ["Scripts & Screenplays", "Books & Reference", "Posters & Prints", "Props & Memorabilia"]
-    equipment_categories = ["Cameras & Camcorders", "Lighting Equipment", "Instruments & Audio"]
-    personal_categories = ["Coffee & Kitchen", "Records & Music", "Furniture"]
-    other_categories = [cat for cat in categories if cat not in creative_categories + equipment_categories + personal_categories]
-    
-    # Creative & Literary items
-    with st.sidebar.expander("**Creative & Literary**", expanded=True):
-        for category in creative_categories:
-            if category in categories:
-                count = category_counts.get(category, 0)
-                st.session_state.selected_categories[category] = st.checkbox(
-                    f"{category} ({count})",
-                    value=st.session_state.selected_categories[category],
-                    key=f"category_{category}"
-                )
-    
-    # Equipment & Technology
-    with st.sidebar.expander("**Equipment & Technology**", expanded=True):
-        for category in equipment_categories:
-            if category in categories:
-                count = category_counts.get(category, 0)
-                st.session_state.selected_categories[category] = st.checkbox(
-                    f"{category} ({count})",
-                    value=st.session_state.selected_categories[category],
-                    key=f"category_{category}"
-                )
-    
-    # Personal & Lifestyle
-    with st.sidebar.expander("**Personal & Lifestyle**", expanded=True):
-        for category in personal_categories:
-            if category in categories:
-                count = category_counts.get(category, 0)
-                st.session_state.selected_categories[category] = st.checkbox(
-                    f"{category} ({count})",
-                    value=st.session_state.selected_categories[category],
-                    key=f"category_{category}"
-                )
-    
-    # Other items
-    if other_categories:
-        with st.sidebar.expander("**Other Items**", expanded=False):
-            for category in other_categories:
-                count = category_counts.get(category, 0)
-                st.session_state.selected_categories[category] = st.checkbox(
-                    f"{category} ({count})",
-                    value=st.session_state.selected_categories[category],
-                    key=f"category_{category}"
-                )
-    
-    # Get selected categories
-    selected_categories = [c for c, checked in st.session_state.selected_categories.items() if checked]
-    
-    # Price range filter - expanded by default
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### Price Range Filter")
-    
-    min_price = int(df["Sold Price"].min())
-    max_price = int(df["Sold Price"].max())
-    
-    price_range = st.sidebar.slider(
-        "Filter by sold price",
-        min_value=min_price,
-        max_value=max_price,
-        value=(min_price, max_price),
-        format="$%d",
-        help="Drag to set minimum and maximum price range"
-    )
+        st.button("Clear All", use_container_width=True,
+                  on_click=_set_session_value, args=("selected_categories", []))
+    
+    # Category and price edits are batched in a form and applied in one rerun
+    with st.sidebar.form("filters", border=False):
+        # One widget for the whole category selection
+        selected_categories = st.multiselect(
+            "Categories",
+            options=category_options,
+            format_func=lambda category: f"{category} ({category_counts.get(category, 0)})",
+            key="selected_categories",
+            label_visibility="collapsed"
+        )
+        
+        # Price range filter - expanded by default
+        st.markdown("---")
+        st.markdown("### Price Range Filter")
+        
+        price_range = st.slider(
+            "Filter by sold price",
+            min_value=min_price,
+            max_value=max_price,
+            value=(min_price, max_price),
+            format="$%d",
+            help="Drag to set minimum and maximum price range"
+        )
+        
+        st.form_submit_button("Apply Filters", use_container_width=True, type="primary")
     
-    if st.session_state.get('price_filter') or keyword or len([c for c, checked in st.session_state.selected_categories.items() if checked]) < len(categories):
-        with st.sidebar.container():
-            st.markdown("---")
-            st.info("🔄 **Filters active** - Results updating...")
-
     # Store price filter in session state
     if price_range != (min_price, max_price):
         st.session_state.price_filter = price_range
     else:
         st.session_state.price_filter = None
     
+    if st.session_state.price_filter or keyword or len(selected_categories) < len(categories):
+        with st.sidebar.container():
+            st.markdown("---")
+            st.info("🔄 **Filters active** - Results updating...")
+    
     return selected_categories, keyword
 
 def create_data_table(df):
@@ -190,23 +204,42 @@ def create_data_table(df):
     """
     from theme_utils import theme_manager
     
-    # Apply theme-responsive CSS
-    current_theme = theme_manager.get_current_theme()
-    theme_css = theme_manager.get_theme_css(current_theme)
-    st.markdown(theme_css, unsafe_allow_html=True)
+    # Theme CSS is injected once per run by the dashboard's global style element
     
-    # Prepare display dataframe
-    df_display = df.copy()
-    df_display["Link"] = df_display["URL"]
+    # Prepare display dataframe (cached per filtered frame)
+    df_display = _prepare_table_data(df)
     
-    # Configure grid options
-    gb = GridOptionsBuilder.from_dataframe(
-        df_display[["Image", "Title", "Sold Price", "Estimated Price", "Estimate Avg", "Category", "Link"]]
-    )
+    # Display the grid with dynamic theme
+    try:
+        AgGrid(
+            df_display,
+            # Shallow copy - AgGrid writes layout keys into the options it receives
+            gridOptions=dict(_grid_options(df_display.head(0))),
+            enable_enterprise_modules=False,
+            allow_unsafe_jscode=True,
+            update_mode="NO_UPDATE",
+            fit_columns_on_grid_load=True,
+            theme=theme_manager.get_aggrid_theme(),  # Dynamic theme!
+            height=600,
+            key="data_table_main"
+        )
+    except Exception as e:
+        st.error(f"Table failed to load: {e}")
+        # Fallback to native Streamlit dataframe
+        st.dataframe(df_display[["Title", "Sold Price", "Estimated Price", "Category"]], use_container_width=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _grid_options(schema):
+    """
+    Build the AgGrid options for the table's column schema once. The options
+    depend only on the columns and dtypes (pass an empty frame), not the rows;
+    cache_resource because they hold JsCode objects.
+    """
+    gb = GridOptionsBuilder.from_dataframe(schema)
     
     # Basic grid configuration
-    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=100)
-    gb.configure_side_bar()
+    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=50)
     gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, editable=False)
     
     # Grid behavior settings
@@ -216,23 +249,17 @@ def create_data_table(df):
         enableCellTextSelection=True,
         domLayout='normal',
         rowHeight=140,
-        suppressContextMenu=False
-    )
-    
-    # Currency formatting for price columns
-    dollar_formatter = JsCode("""
-        function(params) {
-            if (params.value != null) {
-                return '$' + params.value.toLocaleString();
-            } else {
-                return '';
-            }
+        suppressContextMenu=False,
+        context={
+            "imageUrlPrefix": IMAGE_URL_PREFIX,
+            "imageUrlSuffix": IMAGE_URL_SUFFIX,
+            "itemUrlPrefix": ITEM_URL_PREFIX
         }
-    """)
+    )
     
     # Apply formatting to price columns
-    gb.configure_column("Sold Price", type=["numericColumn"], valueFormatter=dollar_formatter)
-    gb.configure_column("Estimate Avg", type=["numericColumn"], valueFormatter=dollar_formatter)
+    gb.configure_column("Sold Price", type=["numericColumn"], valueFormatter=_DOLLAR_FMT)
+    gb.configure_column("Estimate Avg", type=["numericColumn"], valueFormatter=_DOLLAR_FMT)
     
     # Column width configuration
     gb.configure_column("Image", minWidth=120, maxWidth=150)
@@ -247,73 +274,39 @@ def create_data_table(df):
     gb.configure_column(
         "Link",
         header_name="Item Link",
-        cellRenderer=JsCode("""
-            class UrlRenderer {
-                init(params) {
-                    this.eGui = document.createElement('a');
-                    this.eGui.setAttribute('href', params.value);
-                    this.eGui.setAttribute('target', '_blank');
-                    this.eGui.setAttribute('title', 'Open item details in new tab');
-                    this.eGui.style.display = 'inline-flex';
-                    this.eGui.style.alignItems = 'center';
-                    this.eGui.innerHTML = '🔗 Open details page';
-                }
-                getGui() {
-                    return this.eGui;
-                }
-            }
-        """)
+        cellRenderer=_URL_RENDERER
     )
     
     # Custom cell renderer for clickable images
     gb.configure_column(
         "Image",
         header_name="Item Image",
-        cellRenderer=JsCode("""
-            class ImageRenderer {
-                init(params) {
-                    this.eGui = document.createElement('div');
-                    this.eGui.innerHTML = `
-                        <div style="
-                            position: relative;
-                            display: inline-block;
-                            cursor: pointer;
-                        ">
-                            <img src="${params.value}" style="
-                                width: 100px;
-                                transition: transform 0.2s ease;
-                                display: block;
-                                margin: 0 auto;
-                            "
-                            onclick="window.open('${params.value}', '_blank')"
-                            title="Click to view full image">
-                        </div>
-                    `;
-                }
-                getGui() {
-                    return this.eGui;
-                }
-            }
-        """)
+        cellRenderer=_IMAGE_RENDERER
     )
     
-    # Display the grid with dynamic theme
-    try:
-        AgGrid(
-            df_display[["Image", "Title", "Sold Price", "Estimated Price", "Estimate Avg", "Category", "Link"]],
-            gridOptions=gb.build(),
-            enable_enterprise_modules=False,
-            allow_unsafe_jscode=True,
-            update_mode="NO_UPDATE",
-            fit_columns_on_grid_load=True,
-            theme=theme_manager.get_aggrid_theme(),  # Dynamic theme!
-            height=600,
-            key="data_table_main"
-        )
-    except Exception as e:
-        st.error(f"Table failed to load: {e}")
-        # Fallback to native Streamlit dataframe
-        st.dataframe(df_display[["Title", "Sold Price", "Estimated Price", "Category"]], use_container_width=True)
+    return gb.build()
+
+
+@st.cache_data(show_spinner=False)
+def _prepare_table_data(df):
+    """
+    Select the shown columns and expose URL as Link, sending only the per-item
+    part of each URL. Cached so the string work runs once per filter state.
+    """
+    return df[_TABLE_COLS].rename(columns={"URL": "Link"}).assign(
+        Image=_strip_shared_url(df["Image"], IMAGE_URL_PREFIX, IMAGE_URL_SUFFIX),
+        Link=_strip_shared_url(df["URL"], ITEM_URL_PREFIX)
+    )
+
+
+def _strip_shared_url(urls, prefix, suffix=""):
+    """Drop a shared prefix/suffix from URLs; URLs that don't match are kept whole."""
+    matches = urls.str.startswith(prefix) & urls.str.endswith(suffix)
+    trimmed = urls.str.slice(len(prefix))
+    if suffix:
+        trimmed = trimmed.str.slice(0, -len(suffix))
+    return trimmed.where(matches, urls)
+
 
 def create_summary_display(stats):
     """
@@ -329,17 +322,20 @@ def create_summary_display(stats):
         st.warning("No items match the current filter criteria.")
         return
     
-    # Main summary section
-    st.markdown(f"""
-    ### Quick Insights
+    # Main summary section - native metric widgets instead of a markdown list
+    st.subheader("Quick Insights")
     
-    - **Total Items:** {stats["total_items"]:,}
-    - **Total Sold Value:** ${stats["total_value"]:,.0f}
-    - **Average Sold Price:** ${stats["average_price"]:,.0f}
-    - **Price Range:** ${stats["min_price"]:,.0f} - ${stats["max_price"]:,.0f}
-    - **Most Expensive Item:** *{stats["most_expensive"]["Title"]}* (${stats["most_expensive"]["Sold Price"]:,.0f})
-    - **Least Expensive Item:** *{stats["cheapest"]["Title"]}* (${stats["cheapest"]["Sold Price"]:,.0f})
-    """)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Items", f"{stats['total_items']:,}")
+    col2.metric("Total Sold Value", f"${stats['total_value']:,.0f}")
+    col3.metric("Average Sold Price", f"${stats['average_price']:,.0f}")
+    col4.metric("Price Range", f"${stats['min_price']:,.0f} - ${stats['max_price']:,.0f}")
+    
+    col_high, col_low = st.columns(2)
+    col_high.metric("Most Expensive Item", f"${stats['most_expensive']['Sold Price']:,.0f}")
+    col_high.caption(stats["most_expensive"]["Title"])
+    col_low.metric("Least Expensive Item", f"${stats['cheapest']['Sold Price']:,.0f}")
+    col_low.caption(stats["cheapest"]["Title"])
 
 
 def create_download_buttons(df):
@@ -355,49 +351,89 @@ def create_download_buttons(df):
     col1, col2 = st.columns(2)
     
     with col1:
-        # CSV download
-        csv = df.to_csv(index=False).encode("utf-8")
         st.download_button(
             "📁 Download as CSV",
-            data=csv,
+            data=_csv_bytes(df),
             file_name="lynch_collection_filtered.csv",
             mime="text/csv"
         )
     
     with col2:
-        # HTML table download
-        df_export = df.copy()
-        df_export["Link"] = df_export["URL"].apply(lambda x: f'<a href="{x}" target="_blank">Open</a>')
-        html_table = df_export[["Title", "Sold Price", "Estimated Price", "Estimate Avg", "Category", "Link"]].to_html(
-            escape=False, index=False
+        st.download_button(
+            label="📄 Download as HTML",
+            data=_html_bytes(df),
+            file_name="lynch_collection_table.html",
+            mime="text/html"
         )
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmpfile:
-            tmpfile.write(html_table.encode("utf-8"))
-            tmpfile.flush()
-            
-            st.download_button(
-                label="📄 Download as HTML",
-                data=open(tmpfile.name, "rb"),
-                file_name="lynch_collection_table.html",
-                mime="text/html"
-            )
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _csv_bytes(df):
+    """CSV export of the filtered data, encoded by Arrow's native CSV writer."""
+    csv_buffer = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), csv_buffer)
+    return csv_buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _html_bytes(df):
+    """HTML table export of the filtered data with a link to each item."""
+    df_export = df[["Title", "Sold Price", "Estimated Price", "Estimate Avg", "Category"]].assign(
+        Link='<a href="' + df["URL"] + '" target="_blank">Open</a>'
+    )
+    return df_export.to_html(escape=False, index=False).encode("utf-8")
+
+
+def _set_session_value(key, value):
+    """Button callback that writes a widget's session-state value."""
+    st.session_state[key] = value
+
+
+@st.cache_data(show_spinner=False)
+def _sidebar_catalog(df):
+    """
+    Sidebar options for a dataset, computed once per data load.
+    
+    Returns:
+        tuple: (categories, category_counts, min_price, max_price)
+    """
+    category_counts = get_category_counts(df).to_dict()
+    sold = df["Sold Price"].to_numpy()
+    return get_categories(df), category_counts, int(sold.min()), int(sold.max())
+
+
+# Navigation sections, keyed by the name the dashboard uses to pick one
+NAV_TABS = {
+    "browse": "📋 Browse Collection",
+    "map": "🗺️ Collection Map",
+    "prices": "💰 Price Explorer",
+    "insights": "🔍 Key Insights",
+    "about": "ℹ️ About",
+}
 
 
 def create_tab_navigation():
-    """Create enhanced tab navigation with better labels and icons."""
-    return st.tabs([
-        "📋 Browse Collection", 
-        "🗺️ Collection Map", 
-        "💰 Price Explorer", 
-        "🔍 Key Insights", 
-        "ℹ️ About"
-    ])
+    """
+    Create the section navigation as a horizontal radio so only the active
+    section's content is built on each rerun (st.tabs runs every tab body).
+    
+    Returns:
+        str: Key of the active section in NAV_TABS
+    """
+    return st.radio(
+        "Navigate",
+        options=list(NAV_TABS),
+        format_func=NAV_TABS.get,
+        horizontal=True,
+        key="active_tab",
+        label_visibility="collapsed"
+    )
 
 
 def display_filter_info(selected_categories, keyword, total_items, filtered_items):
     """
     Display information about current filter settings and results.
+    Only called while a filter is active.
     
     Args:
         selected_categories (list): Currently selected categories
@@ -408,10 +444,9 @@ def display_filter_info(selected_categories, keyword, total_items, filtered_item
     Returns:
         None: Displays filter information directly in Streamlit
     """
-    if len(selected_categories) < 10 or keyword:  # Only show if filters are active
-        st.info(f"""
-        **Active Filters:** 
-        - Categories: {', '.join(selected_categories) if selected_categories else 'None'}
-        - Keyword: "{keyword}" 
-        - Showing {filtered_items:,} of {total_items:,} items
-        """)
+    st.info(f"""
+    **Active Filters:** 
+    - Categories: {', '.join(selected_categories) if selected_categories else 'None'}
+    - Keyword: "{keyword}" 
+    - Showing {filtered_items:,} of {total_items:,} items
+    """)
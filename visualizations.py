@@ -3,11 +3,78 @@ Visualization Module for David Lynch Collection Dashboard
 Contains functions for creating charts and visualizations
 """
 
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
+from data_processing import get_category_counts, get_top_items
 
+# Above this many leaves the treemap keeps only the most valuable items and
+# folds the rest into one "Other (N items)" leaf per category
+TREEMAP_MAX_LEAVES = 500
+TREEMAP_KEEP_LEAVES = 300
 
+# Number of log-spaced bins in the price distribution histogram
+HISTOGRAM_BINS = 30
+
+# Gallery card styles, sent once per gallery instead of inline on every card
+_GALLERY_CSS = """
+<style>
+.lynch-card {
+    border: 1px solid #ddd;
+    border-radius: 8px;
+    padding: 15px;
+    margin-bottom: 20px;
+    text-align: left;
+    box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
+    height: 450px;
+    display: flex;
+    flex-direction: column;
+    justify-content: flex-start;
+}
+.lynch-card img { width: 100%; height: auto; border-radius: 4px; max-height: 180px; object-fit: contain; }
+.lynch-card h4 { margin: 10px 0; }
+.lynch-card p { font-weight: bold; font-size: 18px; }
+.lynch-card a {
+    display: inline-block;
+    margin-top: 8px;
+    padding: 6px 12px;
+    background-color: #f63366;
+    color: #fff;
+    text-decoration: none;
+    border-radius: 4px;
+    align-self: flex-start;
+}
+</style>
+"""
+
+# Gallery card markup, filled in once per item by show_item_gallery
+_CARD_TPL = """
+<div class="lynch-card">
+    <div>
+        <img src="{image}" />
+        <h4>#{rank}: {title}</h4>
+        <p>💲 ${price:,.0f}</p>
+    </div>
+    <a href="{url}" target="_blank">Visit Item Page</a>
+</div>
+"""
+
+
+def _category_colors(df):
+    """
+    Fixed category colours taken from the Category levels, so each category
+    keeps the same colour however the data is filtered.
+    """
+    palette = px.colors.qualitative.Plotly + px.colors.qualitative.Pastel
+    return {
+        category: palette[i % len(palette)]
+        for i, category in enumerate(df["Category"].cat.categories)
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_treemap(df):
     """
     Create a treemap visualization showing collection hierarchy by category and title.
@@ -18,18 +85,61 @@ def create_treemap(df):
     Returns:
         plotly.graph_objects.Figure: Treemap figure
     """
-    fig_tree = px.treemap(
-        df,
-        path=["Category", "Title"],
-        values="Sold Price",
-        color="Log Sold Price",
-        color_continuous_scale="reds",
-        title="Treemap of Total Sold Price (Colour: Log(Sold Price))"
+    # Pre-aggregate to one row per leaf so Plotly only receives the columns it draws.
+    # Leaf colour is the value-weighted mean Log Sold Price, as plotly.express computes it,
+    # so the price-weighted sum is carried through the groupby and divided out afterwards
+    sold = df["Sold Price"].to_numpy(dtype=np.float64)
+    tree_df = pd.DataFrame({
+        "Category": df["Category"],
+        "Title": df["Title"],
+        "Sold Price": sold,
+        "Weighted": sold * df["Log Sold Price"].to_numpy(dtype=np.float64),
+    }).groupby(["Category", "Title"], as_index=False, observed=True, sort=False).sum()
+    
+    # Fold the long tail of small items into per-category leaves for large selections
+    if len(tree_df) > TREEMAP_MAX_LEAVES:
+        tree_df = tree_df.sort_values("Sold Price", ascending=False, ignore_index=True)
+        tail = tree_df.iloc[TREEMAP_KEEP_LEAVES:].groupby("Category", as_index=False, observed=True).agg(
+            **{
+                "Sold Price": ("Sold Price", "sum"),
+                "Weighted": ("Weighted", "sum"),
+                "Items": ("Title", "size"),
+            }
+        )
+        tail["Title"] = "Other (" + tail.pop("Items").astype(str) + " items)"
+        tree_df = pd.concat([tree_df.iloc[:TREEMAP_KEEP_LEAVES], tail], ignore_index=True)
+    
+    # Build the two-level hierarchy directly: one node per category, one leaf per item.
+    # Category colour is the value-weighted mean of its leaves, as plotly.express computes it
+    leaf_categories = tree_df["Category"].astype(str).to_numpy(dtype=object)
+    leaf_values = tree_df["Sold Price"].to_numpy(dtype=np.float64)
+    leaf_weighted = tree_df["Weighted"].to_numpy(dtype=np.float64)
+    leaf_colors = leaf_weighted / np.where(leaf_values > 0, leaf_values, 1)
+    category_totals = pd.DataFrame(
+        {"value": leaf_values, "weighted": leaf_weighted, "Category": leaf_categories}
+    ).groupby("Category", sort=False).sum()
+    category_values = category_totals["value"].to_numpy()
+    category_colors = category_totals["weighted"].to_numpy() / np.where(category_values > 0, category_values, 1)
+    categories = category_totals.index.to_numpy(dtype=object)
+    
+    fig_tree = go.Figure(go.Treemap(
+        ids=np.concatenate([leaf_categories + "/" + tree_df["Title"].astype(str).to_numpy(dtype=object), categories]),
+        labels=np.concatenate([tree_df["Title"].astype(str).to_numpy(dtype=object), categories]),
+        parents=np.concatenate([leaf_categories, np.full(len(categories), "", dtype=object)]),
+        values=np.concatenate([leaf_values, category_values]),
+        branchvalues="total",
+        marker=dict(colors=np.concatenate([leaf_colors, category_colors]), coloraxis="coloraxis"),
+        hovertemplate="labels=%{label}<br>Sold Price=%{value}<br>parent=%{parent}<br>id=%{id}"
+                      "<br>Log Sold Price=%{color}<extra></extra>"
+    ))
+    fig_tree.update_layout(
+        title="Treemap of Total Sold Price (Colour: Log(Sold Price))",
+        coloraxis=dict(colorscale=px.colors.sequential.Reds, colorbar_title="Log(Sold Price)")
     )
-    fig_tree.update_coloraxes(colorbar_title="Log(Sold Price)")
     return fig_tree
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_scatter_plot(df):
     """
     Create a scatter plot comparing sold prices with estimated averages.
@@ -40,19 +150,35 @@ def create_scatter_plot(df):
     Returns:
         plotly.graph_objects.Figure: Scatter plot figure
     """
-    fig_scatter = px.scatter(
-        df,
-        x="Estimate Avg",
-        y="Sold Price",
-        color="Category",
-        hover_data=["Title", "Estimated Price", "Sold Price", "URL"],
+    category_colors = _category_colors(df)
+    
+    # One WebGL trace per category built directly, skipping plotly.express preprocessing
+    fig_scatter = go.Figure()
+    for category, rows in df.groupby("Category", observed=True):
+        fig_scatter.add_trace(go.Scattergl(
+            x=rows["Estimate Avg"].to_numpy(),
+            y=rows["Sold Price"].to_numpy(),
+            mode="markers",
+            name=category,
+            legendgroup=category,
+            marker=dict(color=category_colors[category]),
+            customdata=rows[["Title", "Estimated Price"]].to_numpy(),
+            hovertemplate=(
+                f"Category={category}<br>Estimated Average ($)=%{{x}}<br>Sold Price ($)=%{{y}}"
+                "<br>Title=%{customdata[0]}<br>Estimated Price=%{customdata[1]}<extra></extra>"
+            )
+        ))
+    fig_scatter.update_layout(
         title="Scatter Plot of Sold Price vs Estimated Average",
-        labels={"Estimate Avg": "Estimated Average ($)", "Sold Price": "Sold Price ($)"}
+        xaxis_title="Estimated Average ($)",
+        yaxis_title="Sold Price ($)",
+        legend_title_text="Category"
     )
     fig_scatter.update_xaxes(type="log")
     return fig_scatter
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_horizontal_bar_chart(df, title_text, n_items=10, ascending=False):
     """
     Create a horizontal bar chart for top expensive or cheapest items.
@@ -66,30 +192,45 @@ def create_horizontal_bar_chart(df, title_text, n_items=10, ascending=False):
     Returns:
         plotly.graph_objects.Figure: Horizontal bar chart figure
     """
-    # Get top/bottom items based on sorting preference
-    if ascending:
-        top_items = df.nsmallest(n_items, "Sold Price").sort_values("Sold Price", ascending=True)
-    else:
-        top_items = df.nlargest(n_items, "Sold Price").sort_values("Sold Price", ascending=False)
-    
-    fig_bar = px.bar(
-        top_items,
-        x="Sold Price",
-        y="Title",
-        orientation="h",
-        color="Category",
-        category_orders={"Title": top_items["Title"].tolist()},
+    # Get top/bottom items based on sorting preference (partial partition, not a full sort)
+    top_items = get_top_items(df, n_items=n_items, ascending=ascending)
+    
+    category_colors = _category_colors(top_items)
+    
+    # One bar trace per category built directly, skipping plotly.express preprocessing
+    fig_bar = go.Figure()
+    for category, rows in top_items.groupby("Category", observed=True):
+        sold = rows["Sold Price"].to_numpy()
+        fig_bar.add_trace(go.Bar(
+            x=sold,
+            y=rows["Title"].to_numpy(),
+            orientation="h",
+            name=category,
+            legendgroup=category,
+            marker_color=category_colors[category],
+            text=sold,
+            texttemplate="$%{text:,.0f}",
+            textposition="inside",
+            hovertemplate=f"Category={category}<br>Sold Price ($)=%{{x}}<br>Item=%{{y}}<extra></extra>"
+        ))
+    fig_bar.update_layout(
         title=title_text,
-        labels={"Sold Price": "Sold Price ($)", "Title": "Item"},
-        text="Sold Price"
+        barmode="relative",
+        xaxis_title="Sold Price ($)",
+        yaxis_title="Item",
+        legend_title_text="Category",
+        # Keep the user's zoom and legend toggles when the filters change
+        uirevision=title_text,
+        # Horizontal bars draw the first category at the bottom, so list the items in reverse
+        yaxis=dict(categoryorder="array", categoryarray=top_items["Title"].tolist()[::-1])
     )
-    fig_bar.update_traces(texttemplate='$%{text:,.0f}', textposition='inside')
     return fig_bar
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_dumbbell_chart(df, n_items=10):
     """Create a dumbbell chart comparing estimated vs sold prices for top items."""
-    top_expensive = df.nlargest(n_items, "Sold Price").sort_values("Sold Price", ascending=False)
+    top_expensive = get_top_items(df, n_items=n_items)
     
     fig_dumbbell = px.scatter(
         top_expensive,
@@ -112,16 +253,24 @@ def create_dumbbell_chart(df, n_items=10):
         name="Actual Sale"
     )
     
-    # Connect with lines
-    for _, row in top_expensive.iterrows():
-        fig_dumbbell.add_shape(
-            type="line",
-            x0=row["Estimate Avg"],
-            y0=row["Title"],
-            x1=row["Sold Price"],
-            y1=row["Title"],
-            line=dict(color="lightgray", width=2)
-        )
+    # Connect with lines - one trace with NaN/None breaks instead of a shape per item
+    n_rows = len(top_expensive)
+    line_x = np.full(3 * n_rows, np.nan)
+    line_x[0::3] = top_expensive["Estimate Avg"].to_numpy()
+    line_x[1::3] = top_expensive["Sold Price"].to_numpy()
+    line_y = np.full(3 * n_rows, None, dtype=object)
+    line_y[0::3] = line_y[1::3] = top_expensive["Title"].to_numpy()
+    
+    fig_dumbbell.add_scatter(
+        x=line_x,
+        y=line_y,
+        mode="lines",
+        line=dict(color="lightgray", width=2),
+        hoverinfo="skip",
+        showlegend=False
+    )
+    # Draw the connectors underneath the markers
+    fig_dumbbell.data = (fig_dumbbell.data[-1],) + fig_dumbbell.data[:-1]
     
     fig_dumbbell.update_layout(
         height=600,
@@ -131,10 +280,10 @@ def create_dumbbell_chart(df, n_items=10):
     
     return fig_dumbbell
 
-@st.cache_data
+@st.cache_data(show_spinner=False, max_entries=32)
 def _prepare_gallery_data(df, n_items):
     """Cache the gallery data preparation to avoid reprocessing on filter changes"""
-    return df.nlargest(n_items, "Sold Price").sort_values("Sold Price", ascending=False).reset_index(drop=True)
+    return get_top_items(df, n_items=n_items).reset_index(drop=True)
 
 def show_item_gallery(df, n_items=10, columns=4):
     """
@@ -151,44 +300,30 @@ def show_item_gallery(df, n_items=10, columns=4):
     # Create column layout
     cols = st.columns(columns)
     
-    # Display each item in the gallery
-    for idx, row in sorted_df.iterrows():
-        with cols[idx % columns]:
-            st.markdown(
-                f"""
-                <div style="
-                    border: 1px solid #ddd;
-                    border-radius: 8px;
-                    padding: 15px;
-                    margin-bottom: 20px;
-                    text-align: left;
-                    box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
-                    height: 450px;
-                    display: flex;
-                    flex-direction: column;
-                    justify-content: flex-start;
-                ">
-                    <div>
-                        <img src="{row['Image']}" style="width: 100%; height: auto; border-radius: 4px; max-height: 180px; object-fit: contain;" />
-                        <h4 style="margin: 10px 0;">#{idx+1}: {row['Title']}</h4>
-                        <p style="font-weight: bold; font-size: 18px;">💲 ${row['Sold Price']:,.0f}</p>
-                    </div>
-                    <a href="{row['URL']}" target="_blank" style="
-                        display: inline-block;
-                        margin-top: 8px;
-                        padding: 6px 12px;
-                        background-color: #f63366;
-                        color: #fff;
-                        text-decoration: none;
-                        border-radius: 4px;
-                        align-self: flex-start;
-                    ">Visit Item Page</a>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+    # Build every card up front, grouped by the column it lands in
+    cards_by_column = [[] for _ in range(columns)]
+    items = zip(
+        sorted_df["Image"].to_numpy(),
+        sorted_df["Title"].to_numpy(),
+        sorted_df["Sold Price"].to_numpy(),
+        sorted_df["URL"].to_numpy()
+    )
+    for idx, (image, title, price, url) in enumerate(items):
+        cards_by_column[idx % columns].append(
+            _CARD_TPL.format_map({"rank": idx + 1, "image": image, "title": title, "price": price, "url": url})
+        )
+    
+    # The card stylesheet rides along with the first column's markup
+    if cards_by_column[0]:
+        cards_by_column[0].insert(0, _GALLERY_CSS)
+    
+    # Send each column's cards as a single markdown element
+    for col, cards in zip(cols, cards_by_column):
+        if cards:
+            col.markdown("".join(cards), unsafe_allow_html=True)
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_category_distribution_chart(df):
     """
     Create a pie chart showing the distribution of items by category.
@@ -199,17 +334,20 @@ def create_category_distribution_chart(df):
     Returns:
         plotly.graph_objects.Figure: Pie chart figure
     """
-    category_counts = df['Category'].value_counts()
+    category_counts = get_category_counts(df)
     
     fig_pie = px.pie(
         values=category_counts.values,
         names=category_counts.index,
         title="Distribution of Items by Category"
     )
+    # Counts arrive sorted largest first, so plotly.js needn't sort them again
+    fig_pie.update_traces(sort=False)
     
     return fig_pie
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_price_distribution_histogram(df):
     """
     Create a histogram showing the distribution of sold prices.
@@ -220,12 +358,25 @@ def create_price_distribution_histogram(df):
     Returns:
         plotly.graph_objects.Figure: Histogram figure
     """
-    fig_hist = px.histogram(
-        df,
-        x="Sold Price",
-        nbins=30,
+    # Bin on the server with log-spaced edges and send only the bar heights
+    prices = df["Sold Price"].to_numpy()
+    low = max(float(prices.min()), 1.0) if len(prices) else 1.0
+    high = max(float(prices.max()), low * 1.01) if len(prices) else 10.0
+    edges = np.geomspace(low, high, HISTOGRAM_BINS + 1)
+    counts, _ = np.histogram(np.clip(prices, low, high), bins=edges)
+    
+    fig_hist = go.Figure(go.Bar(
+        x=np.sqrt(edges[:-1] * edges[1:]),  # geometric bin centres sit evenly on a log axis
+        y=counts,
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate="Sold Price ($)=%{customdata[0]:,.0f} - %{customdata[1]:,.0f}"
+                      "<br>Number of Items=%{y}<extra></extra>"
+    ))
+    fig_hist.update_layout(
         title="Distribution of Sold Prices",
-        labels={"Sold Price": "Sold Price ($)", "count": "Number of Items"}
+        xaxis_title="Sold Price ($)",
+        yaxis_title="Number of Items",
+        bargap=0
     )
     
     # Add logarithmic scale option for better visualization